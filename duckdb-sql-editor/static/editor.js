@@ -0,0 +1,518 @@
+// DuckDB SQL Editor page script
+
+// Debug logging, off unless window.DEBUG is set (it can be set from the console)
+function log(...args) {
+    if (window.DEBUG) console.log(...args);
+}
+
+// Elements touched on every keystroke and tab switch, looked up once
+let _editor, _lineNumbers, _resultsPanel, _tabsContainer, _noQueriesMessage;
+
+function cacheDomRefs() {
+    _editor = document.getElementById('sql-query');
+    _lineNumbers = document.getElementById('line-numbers');
+    _resultsPanel = document.getElementById('query-results');
+    _tabsContainer = document.getElementById('query-tabs');
+    _noQueriesMessage = document.getElementById('no-queries-message');
+}
+
+// Queue DOM reads and writes for the next frame, running all reads before
+// any writes so the browser lays out the page at most once per frame
+const batch = {
+    reads: [],
+    writes: [],
+    scheduled: false,
+    schedule() {
+        if (this.scheduled) return;
+        this.scheduled = true;
+        requestAnimationFrame(() => {
+            this.scheduled = false;
+            this.reads.splice(0).forEach(f => f());
+            this.writes.splice(0).forEach(f => f());
+        });
+    },
+    read(f) { this.reads.push(f); this.schedule(); },
+    write(f) { this.writes.push(f); this.schedule(); }
+};
+
+// Query tabs in the history bar, oldest first, keyed by tab ID. Each entry
+// holds the tab element, its query and a detached copy of its results.
+const tabRegistry = new Map();
+
+// Line number gutter text for the most lines seen so far, and where the
+// text for each line count ends, so it only ever grows by the new lines
+let lineNumberText = '';
+const lineNumberEnds = [0];
+let lineCount = 0;
+let lineNumbersPending = false;
+
+function lineNumbersFor(n) {
+    while (lineNumberEnds.length <= n) {
+        lineNumberText += lineNumberEnds.length + '\n';
+        lineNumberEnds.push(lineNumberText.length);
+    }
+    return lineNumberText.slice(0, lineNumberEnds[n]);
+}
+
+function countNewlines(text) {
+    let count = 0;
+    for (let i = 0; i < text.length; i++) {
+        if (text.charCodeAt(i) === 10) count++;
+    }
+    return count;
+}
+
+// Line number functionality, run at most once per frame
+function updateLineNumbers() {
+    if (lineNumbersPending) return;
+    lineNumbersPending = true;
+
+    batch.read(() => {
+        lineNumbersPending = false;
+        const editor = _editor;
+        const lineNumbers = _lineNumbers;
+        if (!editor || !lineNumbers) return;
+
+        const lines = countNewlines(editor.value) + 1;
+        // Ensure line numbers have the same height as the editor content
+        const height = editor.scrollHeight;
+
+        batch.write(() => {
+            if (lines !== lineCount) {
+                lineNumbers.textContent = lineNumbersFor(lines);
+                lineCount = lines;
+            }
+            lineNumbers.style.height = height + 'px';
+        });
+    });
+}
+
+// Keep the gutter scrolled with the editor, writing once per frame
+let lineNumbersScrollPending = false;
+
+function syncLineNumbersScroll() {
+    if (lineNumbersScrollPending) return;
+    lineNumbersScrollPending = true;
+
+    batch.read(() => {
+        lineNumbersScrollPending = false;
+        if (!_editor || !_lineNumbers) return;
+
+        const scrollTop = _editor.scrollTop;
+        batch.write(() => {
+            _lineNumbers.scrollTop = scrollTop;
+        });
+    });
+}
+
+// Clear editor and results
+function clearEditor() {
+    // Clear the SQL query field
+    const editor = _editor;
+    if (editor) {
+        editor.value = '';
+        updateLineNumbers();
+    }
+
+    // Clear the results panel
+    const resultsPanel = _resultsPanel;
+    if (resultsPanel) {
+        resultsPanel.innerHTML = '<div class="p-4 text-center text-gray-500">Results cleared. Execute a query to see results.</div>';
+    }
+
+    log('Editor and results cleared');
+}
+
+// Message shown in the results panel when there is nothing to show
+const NO_RESULTS_HTML = '<div class="p-4 text-center text-gray-500">No query results to display. Execute a query to see results.</div>';
+
+// Add query to history
+function addQueryToHistory(query, timestamp) {
+    // Create a unique ID for this query tab
+    const tabId = 'query-tab-' + Date.now();
+
+    // Get tabs container
+    const tabsContainer = _tabsContainer;
+    if (!tabsContainer) {
+        console.error('Query tabs container not found');
+        return;
+    }
+
+    // Hide "no queries" message if shown
+    const noQueriesMessage = _noQueriesMessage;
+    if (noQueriesMessage) {
+        noQueriesMessage.style.display = 'none';
+    }
+
+    // Create new tab from the template, filling in text without the HTML parser
+    const newTab = document.getElementById('query-tab-tpl').content.firstElementChild.cloneNode(true);
+    newTab.id = tabId;
+    const [tabText, tabTime] = newTab.children;
+    // Long queries are cut off with an ellipsis by the .query-tab-text style
+    tabText.textContent = query;
+    tabTime.textContent = timestamp;
+
+    // Add to beginning of tabs; clicks are handled by onQueryTabClick
+    tabsContainer.prepend(newTab);
+
+    // Keep a detached copy of the current results; it never enters the live DOM
+    const content = document.createDocumentFragment();
+    if (_resultsPanel) {
+        _resultsPanel.childNodes.forEach(node => content.appendChild(node.cloneNode(true)));
+    }
+    tabRegistry.set(tabId, {tab: newTab, query, content, timestamp});
+    log('Saved results for tab', tabId, 'nodes:', content.childNodes.length);
+
+    // Activate this tab
+    activateQueryTab(tabId);
+
+    // Limit to 10 tabs, dropping the oldest
+    if (tabRegistry.size > 10) {
+        const [oldestId, oldest] = tabRegistry.entries().next().value;
+        tabRegistry.delete(oldestId);
+        oldest.tab.remove();
+    }
+}
+
+// Single click handler for every tab in the history bar
+// (CSS makes the tab's text spans transparent to clicks, so the target is
+// always either a tab or its close button)
+function onQueryTabClick(e) {
+    const isClose = e.target.classList.contains('query-tab-close');
+    const tab = isClose ? e.target.parentNode : e.target;
+    if (!tabRegistry.has(tab.id)) return;
+
+    if (isClose) {
+        removeQueryTab(tab.id);
+    } else {
+        activateQueryTab(tab.id);
+    }
+}
+
+// Activate a query tab
+function activateQueryTab(tabId) {
+    log('Activating tab:', tabId);
+    const entry = tabRegistry.get(tabId);
+
+    // Make the changes together in the next frame
+    batch.write(() => {
+        // Deactivate all tabs
+        tabRegistry.forEach(({tab}) => {
+            tab.classList.remove('active');
+        });
+
+        if (!entry) {
+            console.error('Missing saved results for tab', tabId);
+            // If we're missing content, show a message
+            if (_resultsPanel) {
+                _resultsPanel.innerHTML = '<div class="p-4 text-center text-gray-500">Results not available. Execute the query again to see results.</div>';
+            }
+            return;
+        }
+
+        // Activate this tab
+        entry.tab.classList.add('active');
+
+        // First update the SQL editor with this query
+        if (_editor) {
+            _editor.value = entry.query;
+            updateLineNumbers();
+        }
+
+        // Swap in a copy of this tab's saved results in one step
+        if (_resultsPanel) {
+            _resultsPanel.replaceChildren(entry.content.cloneNode(true));
+        }
+    });
+}
+
+// Remove a query tab
+function removeQueryTab(tabId) {
+    const entry = tabRegistry.get(tabId);
+    if (!entry) return;
+
+    // Check if it's the active tab, then remove it
+    const isActive = entry.tab.classList.contains('active');
+    entry.tab.remove();
+    tabRegistry.delete(tabId);
+
+    if (tabRegistry.size > 0) {
+        // If this was the active one, activate the newest remaining tab
+        if (isActive) {
+            activateQueryTab(Array.from(tabRegistry.keys()).pop());
+        }
+    } else {
+        // If no tabs left, show no queries message
+        if (_noQueriesMessage) {
+            _noQueriesMessage.style.display = 'block';
+        }
+
+        // Clear results panel
+        if (_resultsPanel) {
+            _resultsPanel.innerHTML = NO_RESULTS_HTML;
+        }
+    }
+}
+
+// Clear tab history
+function clearQueryHistory() {
+    // Remove all tabs
+    tabRegistry.forEach(({tab}) => tab.remove());
+    tabRegistry.clear();
+
+    // Show no queries message
+    if (_noQueriesMessage) {
+        _noQueriesMessage.style.display = 'block';
+    }
+
+    // Clear results panel
+    if (_resultsPanel) {
+        _resultsPanel.innerHTML = NO_RESULTS_HTML;
+    }
+}
+
+// Show a short message in the corner without blocking the page like alert() does
+function toast(message, type = 'error') {
+    const t = document.createElement('div');
+    t.className = `toast toast-${type}`;
+    t.textContent = message;
+    document.body.appendChild(t);
+    setTimeout(() => t.remove(), 2500);
+}
+
+// The JSON explorer lives in its own module, loaded the first time a JSON cell is used.
+// Its URL (with a content hash) is passed on this script's data-json-explorer attribute.
+const JSON_EXPLORER_URL = document.currentScript.dataset.jsonExplorer;
+let _jsonExplorer = null;
+
+function withJsonExplorer(action) {
+    _jsonExplorer ??= import(JSON_EXPLORER_URL);
+    _jsonExplorer.then(action).catch(err => {
+        console.error('Failed to load JSON explorer:', err);
+        _jsonExplorer = null;
+        toast('Could not load the JSON explorer');
+    });
+}
+
+function toggleJsonPrettify(element) {
+    withJsonExplorer(m => m.toggleJsonPrettify(element));
+}
+
+function openJsonExplorer(element) {
+    withJsonExplorer(m => m.openJsonExplorer(element));
+}
+
+// Single click handler for every JSON cell in the results panel
+function onResultsClick(e) {
+    const toggle = e.target.closest('.json-toggle');
+    if (toggle) {
+        toggleJsonPrettify(toggle);
+        return;
+    }
+    const exploreBtn = e.target.closest('.json-explore-btn');
+    if (exploreBtn) {
+        openJsonExplorer(exploreBtn);
+    }
+}
+
+function closeJsonExplorer() {
+    withJsonExplorer(m => m.closeJsonExplorer());
+}
+
+function copyJsonPath() {
+    withJsonExplorer(m => m.copyJsonPath());
+}
+
+// Initialize on page load
+document.addEventListener('DOMContentLoaded', function() {
+    cacheDomRefs();
+    if (_tabsContainer) {
+        _tabsContainer.addEventListener('click', onQueryTabClick);
+    }
+    if (_resultsPanel) {
+        _resultsPanel.addEventListener('click', onResultsClick);
+        // Swapped-in children fire afterSwap too and it bubbles; only act on the panel's own
+        _resultsPanel.addEventListener('htmx:afterSwap', e => {
+            if (e.target === _resultsPanel) applyHistoryEntry();
+        });
+    }
+    const editor = _editor;
+    if (editor) {
+        editor.addEventListener('input', updateLineNumbers);
+        editor.addEventListener('scroll', syncLineNumbersScroll, {passive: true});
+
+        // Initialize line numbers
+        updateLineNumbers();
+
+        // Also handle window resize which might affect editor size
+        window.addEventListener('resize', updateLineNumbers);
+    }
+
+    // Initialize mode toggle
+    toggleQueryMode();
+
+    // Submit the form without HTMX if it failed to load
+    setupFallbackFormHandler();
+
+    // Log for debugging
+    log('DOMContentLoaded event fired, initializing SQL editor');
+});
+
+// Sent with fallback requests so FastHTML returns the bare fragment, as it
+// does for HTMX, instead of wrapping it in a full page with every header script
+const FRAGMENT_HEADERS = {'HX-Request': 'true'};
+
+// Forms that already have the fallback submit handler
+const fallbackForms = new WeakSet();
+
+function setupFallbackFormHandler() {
+    // HTMX submits the form itself; the fallback is only needed without it
+    if (typeof htmx !== 'undefined') return;
+
+    const form = document.getElementById('sql-query-form');
+    if (!form || fallbackForms.has(form)) return;
+    fallbackForms.add(form);
+    log('HTMX not loaded, adding fallback form handler');
+
+    form.addEventListener('submit', function(e) {
+        log('Using fallback submission mechanism');
+        e.preventDefault();
+
+        const query = document.getElementById('sql-query').value;
+        const formData = new FormData();
+        formData.append('query', query);
+
+        fetch('/execute-query', {
+            method: 'POST',
+            headers: FRAGMENT_HEADERS,
+            body: formData
+        })
+        .then(response => response.text())
+        .then(html => {
+            const resultDiv = document.getElementById('query-results');
+            if (resultDiv) {
+                resultDiv.innerHTML = html;
+                applyHistoryEntry();
+                log('Results updated via fallback handler');
+            }
+        })
+        .catch(error => {
+            console.error('Error in fallback submission:', error);
+            toast('Error executing query. Check console for details.');
+        });
+    });
+}
+
+// Query responses carry a JSON history entry instead of an inline script; add
+// its tab (and, for translations, load its SQL into the editor) once swapped in
+function applyHistoryEntry() {
+    const script = _resultsPanel && _resultsPanel.querySelector('script.query-history-entry');
+    if (!script) return;
+    const entry = JSON.parse(script.textContent);
+    if (entry.loadIntoEditor && _editor) {
+        _editor.value = entry.query;
+    }
+    log('Adding query to history:', entry.timestamp);
+    addQueryToHistory(entry.query, entry.timestamp);
+    reinitializePage();
+}
+
+// Call this function after a result is swapped in; HTMX has already
+// processed the new content, and the form itself is never replaced
+function reinitializePage() {
+    log('Reinitializing page...');
+    updateLineNumbers();
+
+    // Make sure the mode toggle is correctly set
+    toggleQueryMode();
+}
+
+// Mode toggle function
+function toggleQueryMode() {
+    const form = document.getElementById('sql-query-form');
+    const sqlLabel = document.getElementById('sql-mode-label');
+    const nlLabel = document.getElementById('nl-mode-label');
+    const isNLMode = document.getElementById('nl-toggle').checked;
+
+    if (isNLMode) {
+        // Fade the translate button, badge and hint in only when switching modes,
+        // not on every reinitialise
+        const switching = !form.classList.contains('nl-mode');
+        form.classList.add('nl-mode');
+        if (switching) {
+            document.querySelectorAll('#sql-query-form .translate-btn, .nl-badge, .nl-hint').forEach(el => {
+                if (el.animate) {
+                    el.animate([{opacity: 0}, {opacity: 1}], {duration: 300, easing: 'ease-in-out'});
+                }
+            });
+        }
+        nlLabel.classList.add('active');
+        sqlLabel.classList.remove('active');
+        document.getElementById('sql-query').placeholder = "Ask a question about your data in plain English...";
+    } else {
+        form.classList.remove('nl-mode');
+        sqlLabel.classList.add('active');
+        nlLabel.classList.remove('active');
+        document.getElementById('sql-query').placeholder = "SELECT * FROM table_name LIMIT 10;";
+    }
+}
+
+// Quiet interval before a translation is sent, so repeated clicks only cost one OpenAI call
+const TRANSLATE_DEBOUNCE_MS = 300;
+let translateTimer;
+
+// Handle translation form submission
+function handleTranslateSubmit(event) {
+    event.preventDefault();
+    log("Translation button clicked");
+    clearTimeout(translateTimer);
+    translateTimer = setTimeout(submitTranslation, TRANSLATE_DEBOUNCE_MS);
+}
+
+function submitTranslation() {
+    const isNLMode = document.getElementById('nl-toggle').checked;
+    if (!isNLMode) {
+        log("Not in NL mode, ignoring translate click");
+        return;
+    }
+
+    const query = document.getElementById('sql-query').value;
+    if (!query.trim()) {
+        toast("Please enter a question first");
+        return;
+    }
+
+    const formData = new FormData();
+    formData.append('query', query);
+
+    // Show loading state in the main query results area
+    const resultsPanel = document.getElementById('query-results');
+    resultsPanel.innerHTML = '<div class="p-4 text-center"><div class="animate-pulse">Translating your query...</div></div>';
+
+    log("Sending translation request");
+
+    // Use either htmx or fetch API
+    if (typeof htmx !== 'undefined') {
+        // Issued from the form so its hx-sync cancels any request still in flight
+        htmx.ajax('POST', '/translate-query', {
+            source: '#sql-query-form',
+            target: '#query-results',
+            swap: 'innerHTML',
+            values: formData
+        });
+    } else {
+        fetch('/translate-query', {
+            method: 'POST', 
+            headers: FRAGMENT_HEADERS,
+            body: formData
+        })
+        .then(response => response.text())
+        .then(html => {
+            resultsPanel.innerHTML = html;
+            applyHistoryEntry();
+        })
+        .catch(error => {
+            resultsPanel.innerHTML = `<div class="p-4 bg-red-50 text-red-700 rounded-lg">Error: ${error.message}</div>`;
+        });
+    }
+}
@@ -0,0 +1,219 @@
+// DuckDB SQL Editor JSON explorer: prettified JSON cells and the explorer modal.
+// Loaded on demand by editor.js the first time a JSON cell is used.
+
+// Selected item in the open explorer's tree
+let activeJsonItem = null;
+
+// Parsed values of recently viewed JSON cells, keyed by the cell text
+const _parsedJson = new Map();
+// Pretty-printed text for each result cell that has been expanded
+const _jsonCache = new WeakMap();
+
+// JSON.parse with a small least-recently-used cache
+function parseJson(str) {
+    if (_parsedJson.has(str)) {
+        const value = _parsedJson.get(str);
+        // Re-insert so the oldest entry stays first in iteration order
+        _parsedJson.delete(str);
+        _parsedJson.set(str, value);
+        return value;
+    }
+    const value = JSON.parse(str);
+    _parsedJson.set(str, value);
+    if (_parsedJson.size > 256) {
+        _parsedJson.delete(_parsedJson.keys().next().value);
+    }
+    return value;
+}
+
+// Parse str as JSON, returning undefined instead of throwing when it isn't
+function tryParseJson(str) {
+    try {
+        return parseJson(str);
+    } catch (e) {
+        return undefined;
+    }
+}
+
+// Format JSON for display
+function formatJsonForDisplay(jsonString, indent = 2) {
+    try {
+        const parsedJson = parseJson(jsonString);
+        return JSON.stringify(parsedJson, null, indent);
+    } catch (e) {
+        console.error('Error formatting JSON:', e);
+        return jsonString;
+    }
+}
+
+// Payload arrays of each result's JSON cells, keyed by the script tag that carries them
+const _jsonPayloads = new WeakMap();
+
+// Full JSON text of a result cell, read from its result's json-payloads script
+function jsonPayloadFor(jsonCell) {
+    const result = jsonCell.closest('.single-query-result');
+    const holder = result && result.querySelector('script.json-payloads');
+    if (!holder) return undefined;
+
+    let payloads = _jsonPayloads.get(holder);
+    if (!payloads) {
+        payloads = tryParseJson(holder.textContent) || [];
+        _jsonPayloads.set(holder, payloads);
+    }
+    return payloads[Number(jsonCell.dataset.jsonId)];
+}
+
+// Toggle JSON prettification
+export function toggleJsonPrettify(element) {
+    const jsonCell = element.closest('.json-cell');
+    const jsonData = jsonPayloadFor(jsonCell);
+    const prettifiedContainer = jsonCell.querySelector('.json-prettified');
+
+    if (prettifiedContainer.style.display === 'none' || !prettifiedContainer.style.display) {
+        let pretty = _jsonCache.get(jsonCell);
+        if (pretty === undefined) {
+            pretty = formatJsonForDisplay(jsonData);
+            _jsonCache.set(jsonCell, pretty);
+        }
+        prettifiedContainer.textContent = pretty;
+        prettifiedContainer.style.display = 'block';
+    } else {
+        prettifiedContainer.style.display = 'none';
+    }
+}
+
+// Open JSON explorer modal for the cell containing element
+export function openJsonExplorer(element) {
+    const jsonCell = element.closest('.json-cell');
+    const columnName = jsonCell.dataset.column;
+
+    // Parse the JSON, reusing the value if this cell was opened before
+    const jsonString = jsonPayloadFor(jsonCell);
+    const jsonData = jsonString === undefined ? undefined : tryParseJson(jsonString);
+    if (jsonData === undefined) {
+        console.error('Error opening JSON explorer: value is not valid JSON');
+        toast('Error parsing JSON data');
+        return;
+    }
+
+    // Create modal from the template
+    const modal = document.getElementById('json-explorer-tpl').content.firstElementChild.cloneNode(true);
+    modal.querySelector('.json-explorer-title').textContent = `JSON Explorer: ${columnName}`;
+    modal.querySelector('.json-content').textContent = JSON.stringify(jsonData, null, 2);
+
+    // Add to document
+    document.body.appendChild(modal);
+
+    // Generate tree; one listener handles clicks on every level
+    const tree = document.getElementById('json-tree');
+    tree.addEventListener('click', onJsonTreeClick);
+    generateJsonTree(jsonData, tree, '$');
+}
+
+// Close JSON explorer modal
+export function closeJsonExplorer() {
+    const modal = document.getElementById('json-explorer-modal');
+    if (modal) {
+        document.body.removeChild(modal);
+    }
+    activeJsonItem = null;
+}
+
+// Generate one level of the JSON tree; deeper levels are built on first expand
+function generateJsonTree(data, container, path = '$') {
+    if (typeof data !== 'object' || data === null) return;
+
+    const isArray = Array.isArray(data);
+    const list = document.createElement('div');
+    list.className = 'json-tree-children';
+    // Object keys are appended to the parent path; the root has no trailing dot
+    const prefix = path === '$' ? '$.' : path + '.';
+
+    const keys = Object.keys(data);
+    for (let i = 0, n = keys.length; i < n; i++) {
+        const key = keys[i];
+        const value = data[key];
+        const item = document.createElement('div');
+        item.className = 'json-tree-item';
+        // Read back by onJsonTreeClick
+        item.dataset.jsonPath = isArray ? `${path}[${key}]` : prefix + key;
+        item._jsonValue = value;
+
+        const valueType = typeof value;
+        const isComplex = valueType === 'object' && value !== null;
+
+        if (isComplex) {
+            const toggle = document.createElement('span');
+            toggle.className = 'json-tree-toggle';
+            toggle.textContent = '▶';
+            item.appendChild(toggle);
+        }
+
+        const itemText = document.createElement('span');
+        if (isArray) {
+            itemText.append(`[${key}]`);
+        } else {
+            const keySpan = document.createElement('span');
+            keySpan.className = 'json-key';
+            keySpan.textContent = key;
+            itemText.appendChild(keySpan);
+        }
+        const typeSpan = document.createElement('span');
+        typeSpan.className = 'json-value-type';
+        typeSpan.textContent = valueType;
+        itemText.appendChild(typeSpan);
+        item.appendChild(itemText);
+
+        if (isComplex) {
+            const childContainer = document.createElement('div');
+            childContainer.className = 'json-tree-children';
+            childContainer.style.display = 'none';
+            item.appendChild(childContainer);
+        }
+
+        list.appendChild(item);
+    }
+
+    container.appendChild(list);
+}
+
+// Single click handler for the JSON tree: expand/collapse or select an item
+function onJsonTreeClick(e) {
+    const item = e.target.closest('.json-tree-item');
+    if (!item) return;
+
+    const toggle = e.target.closest('.json-tree-toggle');
+    if (toggle) {
+        const childContainer = item.querySelector(':scope > .json-tree-children');
+        // Build the children the first time this level is expanded
+        if (!childContainer.hasChildNodes()) {
+            generateJsonTree(item._jsonValue, childContainer, item.dataset.jsonPath);
+        }
+        if (childContainer.style.display === 'none') {
+            childContainer.style.display = 'block';
+            toggle.textContent = '▼';
+        } else {
+            childContainer.style.display = 'none';
+            toggle.textContent = '▶';
+        }
+        return;
+    }
+
+    if (activeJsonItem) {
+        activeJsonItem.classList.remove('active');
+    }
+    item.classList.add('active');
+    activeJsonItem = item;
+    document.getElementById('current-json-path').textContent = item.dataset.jsonPath;
+    document.getElementById('json-content').textContent = JSON.stringify(item._jsonValue, null, 2);
+}
+
+// Copy JSON path to clipboard
+export function copyJsonPath() {
+    const path = document.getElementById('current-json-path').textContent;
+    navigator.clipboard.writeText(path).then(() => {
+        toast('JSON path copied to clipboard!', 'success');
+    }).catch(err => {
+        console.error('Failed to copy:', err);
+    });
+}
@@ -0,0 +1,148 @@
+// DuckDB SQL Editor database selection modal
+
+// Open the modal
+function openModal() {
+    log('Opening modal');
+    const dialog = document.getElementById('db-modal');
+    if (!dialog) {
+        console.error('Modal element not found!');
+        return;
+    }
+
+    // Fill the modal with a fresh copy of its markup
+    dialog.replaceChildren(document.getElementById('modal-tpl').content.cloneNode(true));
+
+    // Add htmx event handlers after content is injected
+    setupFormHandlers();
+
+    // The browser handles the backdrop, centering, focus and Escape
+    dialog.showModal();
+}
+
+// Close the modal
+function closeModal() {
+    const dialog = document.getElementById('db-modal');
+    if (dialog && dialog.open) {
+        dialog.close();
+    }
+}
+
+// Runs however the modal was closed: the close button, the backdrop or Escape
+function onModalClosed() {
+    log('Closing modal');
+
+    // Check if we should reload the page due to database change
+    const resultArea = document.getElementById('result-area');
+    const shouldReload = resultArea && 
+        resultArea.textContent && 
+        resultArea.textContent.includes('Successfully connected to');
+
+    // Clear any previous messages
+    if (resultArea) {
+        resultArea.innerHTML = '';
+    }
+
+    // If database was changed successfully, reload the page
+    if (shouldReload) {
+        log('Database changed successfully. Reloading page...');
+        window.location.reload();
+    }
+}
+
+// Clicks on the backdrop land on the dialog itself, outside its box
+function onModalClick(event) {
+    const dialog = event.currentTarget;
+    if (event.target !== dialog) return;
+
+    const rect = dialog.getBoundingClientRect();
+    const inside = event.clientX >= rect.left && event.clientX <= rect.right &&
+                   event.clientY >= rect.top && event.clientY <= rect.bottom;
+    if (!inside) {
+        closeModal();
+    }
+}
+
+const dbModal = document.getElementById('db-modal');
+if (dbModal) {
+    dbModal.addEventListener('close', onModalClosed);
+    dbModal.addEventListener('click', onModalClick);
+}
+
+// Setup htmx form handlers
+function setupFormHandlers() {
+    const uploadForm = document.getElementById('upload-form');
+    if (uploadForm) {
+        log('Found upload form, adding event listener');
+        uploadForm.addEventListener('submit', function(e) {
+            e.preventDefault();
+
+            // Show loading state
+            const uploadBtn = document.getElementById('upload-btn');
+            if (uploadBtn) {
+                uploadBtn.disabled = true;
+                uploadBtn.innerHTML = 'Connecting...';
+            }
+
+            const formData = new FormData(uploadForm);
+            const fileInput = document.getElementById('db_file');
+
+            // Validate file extension
+            if (fileInput && fileInput.files.length > 0) {
+                const filename = fileInput.files[0].name;
+                if (!filename.endsWith('.duckdb') && !filename.endsWith('.db')) {
+                    document.getElementById('result-area').innerHTML = `
+                        <div class="bg-red-50 border border-red-400 text-red-700 px-4 py-3 rounded relative">
+                            <strong>Error!</strong>
+                            <p>Please select a valid .duckdb or .db file</p>
+                        </div>
+                    `;
+                    if (uploadBtn) {
+                        uploadBtn.disabled = false;                                    }
+                    return;
+                }
+            }
+
+            fetch('/change-database', {
+                method: 'POST',
+                body: formData
+            })
+            .then(response => response.json())
+            .then(data => {
+                const resultArea = document.getElementById('result-area');
+                if (data.success) {
+                    resultArea.innerHTML = `
+                        <div class="bg-green-50 border border-green-400 text-green-700 px-4 py-3 rounded relative">
+                            <strong>Success!</strong>
+                            <p>${data.message}</p>
+                            <p class="mt-2">Reloading page in 2 seconds...</p>
+                        </div>
+                    `;
+                    // Automatically reload after successful connection
+                    setTimeout(() => window.location.reload(), 2000);
+                } else {
+                    resultArea.innerHTML = `
+                        <div class="bg-red-50 border border-red-400 text-red-700 px-4 py-3 rounded relative">
+                            <strong>Error!</strong>
+                            <p>${data.message}</p>
+                        </div>
+                    `;
+                    if (uploadBtn) {
+                        uploadBtn.disabled = false;
+                    }
+                }
+            })
+            .catch(error => {
+                document.getElementById('result-area').innerHTML = `
+                    <div class="bg-red-50 border border-red-400 text-red-700 px-4 py-3 rounded relative">
+                        <strong>Error!</strong>
+                        <p>An unexpected error occurred</p>
+                    </div>
+                `;
+                if (uploadBtn) {
+                    uploadBtn.disabled = false;
+                    uploadBtn.innerHTML = 'Upload and Connect';
+                }
+            });
+        });
+    }
+}